@@ -0,0 +1,439 @@
+import ast
+import json
+import logging
+import os
+import re
+import sys
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+MANIFEST_FILE = "__manifest__.py"
+# Fallback matcher for the "depends" element; compiled once instead of going through the re cache
+# on every call. The old inline pattern's [\"|'] class also matched a literal '|' by mistake
+_DEPENDS_RE = re.compile("[\"']depends[\"']\\s*:\\s*\\[[^]]*],")
+# Where downloaded hierarchies are cached, and for how long they are considered fresh
+CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "odoo-dependency-trimmer"
+CACHE_MAX_AGE = 24 * 3600
+
+_logger = logging.getLogger(__name__)
+
+
+def _scan(path, seen):
+    """
+    Yields (module_name, dependencies) for every manifest file under path, walking with an
+    explicit stack: no frame allocation per directory and no RecursionError on deep trees.
+    Uses os.scandir so the directory/file checks reuse the stat already fetched while listing.
+    Directories holding a manifest are not descended into: Odoo modules never nest, so their
+    static/, models/, views/... subtrees can be skipped entirely
+    :param path: directory to scan
+    :param seen: set of (st_dev, st_ino) pairs of directories already visited; directories found
+    there are skipped, so overlapping -p roots do not re-read the same manifests
+    :return: generator of ('module_name', {'dependency_one', 'dependency_two'}) tuples
+    """
+    stack = [path]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                entries = list(it)
+        except OSError as error:
+            # Unreadable or concurrently removed directory: skip it, like os.walk used to
+            _logger.warning("Skipping %s: %s", current, error)
+            continue
+        manifest = None
+        for entry in entries:
+            if entry.name == MANIFEST_FILE and entry.is_file(follow_symlinks=False):
+                manifest = entry
+                break
+        if manifest is not None:
+            yield sys.intern(os.path.basename(current)), set(_read_manifest_deps(manifest.path))
+            continue
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                try:
+                    stat = entry.stat(follow_symlinks=False)
+                except OSError as error:
+                    _logger.warning("Skipping %s: %s", entry.path, error)
+                    continue
+                key = (stat.st_dev, stat.st_ino)
+                if key not in seen:
+                    seen.add(key)
+                    stack.append(entry.path)
+
+
+def read_deps(path, seen=None):
+    """
+    Find all manifest files in this directory
+    :param path: where to recursive find manifest files
+    :param seen: optional set of (st_dev, st_ino) pairs of directories already visited
+    :return: dict as {'module_name': ['dependency_one', 'dependency_two']}
+    """
+    # A trailing slash would make os.path.basename return '' if path is itself a module
+    path = os.path.normpath(path)
+    if seen is None:
+        seen = set()
+    try:
+        stat = os.stat(path)
+    except OSError as error:
+        # Missing or unreadable root: yield nothing, like os.walk used to
+        _logger.warning("Skipping %s: %s", path, error)
+        return dict()
+    key = (stat.st_dev, stat.st_ino)
+    if key in seen:
+        return dict()
+    seen.add(key)
+    return dict(_scan(path, seen))
+
+
+def read_deps_parallel(path, workers=None, seen=None):
+    """
+    Same as read_deps, but scans the immediate subdirectories of path concurrently.
+    The walk is latency-bound on stat/open syscalls and the GIL is released inside
+    os.scandir and open, so a thread pool overlaps that latency across subtrees
+    :param path: where to recursive find manifest files
+    :param workers: maximum number of threads, defaults to min(32, cpu_count * 4)
+    :param seen: optional set of (st_dev, st_ino) pairs of directories already visited
+    :return: dict as {'module_name': ['dependency_one', 'dependency_two']}
+    """
+    # A trailing slash would make os.path.basename return '' if path is itself a module
+    path = os.path.normpath(path)
+    if workers is None:
+        workers = min(32, (os.cpu_count() or 1) * 4)
+    if seen is None:
+        seen = set()
+    try:
+        stat = os.stat(path)
+    except OSError as error:
+        # Missing or unreadable root: yield nothing, like os.walk used to
+        _logger.warning("Skipping %s: %s", path, error)
+        return dict()
+    key = (stat.st_dev, stat.st_ino)
+    if key in seen:
+        return dict()
+    seen.add(key)
+    try:
+        with os.scandir(path) as it:
+            entries = list(it)
+    except OSError as error:
+        _logger.warning("Skipping %s: %s", path, error)
+        return dict()
+    for entry in entries:
+        if entry.name == MANIFEST_FILE and entry.is_file(follow_symlinks=False):
+            return {sys.intern(os.path.basename(path)): set(_read_manifest_deps(entry.path))}
+    subdirs = [entry.path for entry in entries if entry.is_dir(follow_symlinks=False)]
+    deps = dict()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # seen is shared between workers: set operations are atomic under the GIL
+        for result in executor.map(lambda subdir: read_deps(subdir, seen), subdirs):
+            deps.update(result)
+    return deps
+
+
+def _read_manifest_deps(manifest_file):
+    """
+    Get the list of dependencies for this manifest file. Only the 'depends' node of the manifest
+    is evaluated: literal_eval on the whole file would build the big description/data/assets
+    fields just to throw them away
+    :param manifest_file:
+    :return: the content of the 'depends' field as a python list, an empty list if no 'depends'
+    """
+    with open(manifest_file, 'rt') as fd:
+        manifest_data = fd.read()
+    try:
+        manifest = ast.parse(manifest_data, mode='eval').body
+        if isinstance(manifest, ast.Dict):
+            for key, value in zip(manifest.keys, manifest.values):
+                if isinstance(key, ast.Constant) and key.value == "depends":
+                    return [sys.intern(dep) for dep in ast.literal_eval(value)]
+            return []
+    except (SyntaxError, ValueError):
+        pass
+    # Unexpected manifest shape (non-dict expression, non-constant keys...): evaluate it whole
+    return [sys.intern(dep) for dep in ast.literal_eval(manifest_data).get("depends", [])]
+
+
+def _loads(data):
+    """
+    Parses JSON bytes with orjson when available (3-10x faster than the stdlib parser on the
+    multi-megabyte version trees), falling back to json otherwise
+    :param data: JSON document as bytes
+    :return: the parsed object
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _intern_hierarchy(hierarchy):
+    """
+    Interns every module name in a hierarchy, so each name is backed by a single str object no
+    matter how many dependency sets it appears in. Set and dict lookups on interned names then
+    short-circuit on identity instead of comparing characters
+    :param hierarchy: a hierarchy of modules, as a dict {"module": ["dep1", "dep2"], }
+    :return: the same hierarchy with all names interned
+    """
+    return {sys.intern(module): [sys.intern(dep) for dep in deps] for module, deps in hierarchy.items()}
+
+
+def _download_dependency_hierarchy(odoo_version):
+    """
+    Fetches the dependency hierarchy from an online file, depending on the version. The download
+    is cached in CACHE_DIR for CACHE_MAX_AGE seconds: the tool typically runs as a pre-commit
+    hook, so going to GitHub on every invocation would cost a network round trip each time
+    :param odoo_version: supported 14.0 and 15.0
+    :return: the main hierarchy of modules, as a dict {"module": ["dep1", "dep2"], }, including standard, enterprise
+     and themes modules
+    """
+    cache_file = CACHE_DIR / f"{odoo_version}.json"
+    try:
+        if time.time() - cache_file.stat().st_mtime < CACHE_MAX_AGE:
+            return _intern_hierarchy(_loads(cache_file.read_bytes()))
+    except (OSError, ValueError):
+        # Missing, unreadable or corrupt cache: download again
+        pass
+    import requests
+    file = requests.get(
+        f"https://raw.githubusercontent.com/pasculorente/odoo-dependency-trimmer/main/trees/{odoo_version}.json")
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        temp_file = cache_file.with_suffix(".tmp")
+        temp_file.write_bytes(file.content)
+        os.replace(temp_file, cache_file)
+    except OSError:
+        _logger.warning("Could not cache the dependency hierarchy in %s", cache_file)
+    return _intern_hierarchy(_loads(file.content))
+
+
+def _create_dependency_hierarchy(paths):
+    """
+    Generates the dependency hierarchy by merging all hierarchies created by each path in paths
+    :param paths: iterable of paths to look for manifest files
+    :return: a hierarchy of modules, as a dict {"module": ["dep1", "dep2"], }
+    """
+    dependency_tree = dict()
+    seen = set()
+    for path in paths:
+        dependency_tree.update(read_deps_parallel(path, seen=seen))
+    return dependency_tree
+
+
+def _format_tree(tree, root):
+    """
+    Helper function which renders a tree as an indented string, one '- module' line per node.
+    The tree is walked iteratively and joined once, instead of one print call (stdio lock plus
+    flush) per node
+    :param tree: the tree to render
+    :param root: the element to start from
+    :return: the string representation of the tree under root
+    """
+    out = []
+    stack = [(root, 0)]
+    while stack:
+        element, level = stack.pop()
+        out.append(f"{level * 4 * ' '}- {element}\n")
+        for sub_element in tree[element]:
+            stack.append((sub_element, level + 1))
+    return ''.join(out)
+
+
+def _transitive(dependency_hierarchy, modules):
+    """
+    Computes, for every module reachable from modules, the set of all its transitive dependencies.
+    Only the subgraph reachable from modules is considered; it is topologically sorted with
+    Kahn's algorithm and the closures are accumulated sinks-first in one linear pass, so shared
+    subtrees (base, web...) are resolved once instead of once per module that reaches them
+    :param dependency_hierarchy: the main hierarchy of modules, as a dict {"module": ["dep1", "dep2"], }
+    :param modules: modules whose closures are needed
+    :return: a dict {"module": {"dep1", "dep2", ...}} covering modules and everything they reach
+    """
+    # Restrict to the subgraph reachable from modules
+    reachable = set()
+    stack = list(modules)
+    while stack:
+        node = stack.pop()
+        if node not in reachable:
+            reachable.add(node)
+            stack.extend(dependency_hierarchy.get(node, ()))
+    # Kahn's algorithm over the subgraph
+    in_degree = dict.fromkeys(reachable, 0)
+    for node in reachable:
+        for dep in dependency_hierarchy.get(node, ()):
+            in_degree[dep] += 1
+    queue = deque(node for node in reachable if in_degree[node] == 0)
+    order = []
+    while queue:
+        node = queue.popleft()
+        order.append(node)
+        for dep in dependency_hierarchy.get(node, ()):
+            in_degree[dep] -= 1
+            if in_degree[dep] == 0:
+                queue.append(dep)
+    # Accumulate closures in reverse topological order: deps are always resolved before users
+    closures = dict()
+    for node in reversed(order):
+        closure = set()
+        for dep in dependency_hierarchy.get(node, ()):
+            closure.add(dep)
+            closure |= closures[dep]
+        closures[node] = closure
+    return closures
+
+
+def min_spanning_tree(dependency_hierarchy, modules):
+    """
+        Main algorithm: given a main tree and a list of modules, returns a minimum tree that contains the modules
+        :param dependency_hierarchy: the main hierarchy of modules, as a dict {"module": ["dep1", "dep2"], }
+        :param modules: list of modules to search in the tree
+        :return: a dict in the same format as dependency_hierarchy, that contains the minimum relations to contain all
+        modules
+        """
+    modset = set(modules)
+    closures = _transitive(dependency_hierarchy, modset)
+    # Keep only the modules not implied by another one: visiting them by decreasing closure size
+    # means a module is always processed after anything that could cover it, so one pass decides.
+    # The sort also makes the outcome independent of set iteration order
+    kept = []
+    covered = set()
+    for module in sorted(modset, key=lambda m: (-len(closures[m]), m)):
+        if module not in covered:
+            kept.append(module)
+            covered |= closures[module]
+    rtn = defaultdict(set)
+    rtn.update({x: set() for x in modules})
+    for start in kept:
+        # The closure tells upfront which other modules this one reaches; skip the BFS entirely
+        # when there is none
+        targets = modset & closures[start]
+        if not targets:
+            continue
+        # One BFS from start reaches every other module at once, instead of one search per pair
+        parents = {start: None}
+        queue = deque([start])
+        while queue:
+            module = queue.popleft()
+            for dep in dependency_hierarchy.get(module, ()):
+                if dep not in parents:
+                    parents[dep] = module
+                    queue.append(dep)
+        for end in targets:
+            module = end
+            while parents[module] is not None:
+                rtn[parents[module]].add(module)
+                module = parents[module]
+    return rtn
+
+
+def get_dependency_hierarchy(path_list, odoo_version):
+    """
+    Gets the dependency hierarchy either by exploring all paths in path_list or by downloading from github file
+    :param path_list: a list of paths to explore
+    :param odoo_version: the version of Odoo whose hierarchy to fetch
+    :return: a hierarchy of modules, as a dict {"module": ["dep1", "dep2"], }
+    """
+    if path_list:
+        all_paths = set()
+        for path in path_list:
+            all_paths.update(path.split(","))
+        return _create_dependency_hierarchy(all_paths)
+    elif odoo_version:
+        return _download_dependency_hierarchy(odoo_version)
+    else:
+        raise ValueError("One of -p or -w must be present")
+
+
+def get_module_list(dependencies, manifest):
+    """
+    Returns the list of modules to search
+    :param dependencies: if specified, returns the unique, strip values
+    :param manifest: if specified, returns the "depends" list inside the manifest
+    :return: the list of modules to search
+    """
+    if dependencies and manifest:
+        raise ValueError("manifest and dependencies are exclusive")
+    if dependencies:
+        return list({x.strip() for x in dependencies.split(",")})
+    elif manifest:
+        return _read_manifest_deps(manifest)
+    else:
+        raise ValueError("One of manifest or dependencies must be present")
+
+
+def create_deps_string(deps, spacing=4, quote='"'):
+    """
+    Creates a nice looking (close to pre-commit) string to replace the "depends" element in the manifest
+
+        "depends": ["dep1", "dep2",]
+
+    :param deps: list of dependencies
+    :param spacing: number of spaces to indent
+    :param quote: how to quote strings
+    :return: the string representation of a "depends" element
+    """
+    indent = spacing * ' '
+    indent2 = indent * 2
+    # join builds the string in one pass; += reallocates the accumulator on every iteration
+    inner = ''.join(f'{indent2}"{d}",\n' for d in deps)
+    return f'{quote}depends{quote}: [\n{inner}{indent}],'
+
+
+def print_hierarchy(hierarchy, roots):
+    """
+    Prints the hierarchy as a tree for every element in result, in a single stdout write
+    :param hierarchy: a modules' hierarchy
+    :param roots: list of root modules to print their trees
+    """
+    sys.stdout.write(''.join(_format_tree(hierarchy, res) for res in roots))
+
+
+def _replace_depends(data, dep_string):
+    """
+    Replaces the "depends" element of a manifest source with dep_string. The manifest is parsed
+    with ast, which gives the exact position of the 'depends' key and its value, so the splice
+    works on nested brackets and multiline entries where the old regex broke. The regex is kept
+    as a fallback for manifests ast cannot parse
+    :param data: the manifest source
+    :param dep_string: the new "depends" element, as built by create_deps_string
+    :return: the modified manifest source
+    """
+    try:
+        manifest = ast.parse(data, mode='eval').body
+    except SyntaxError:
+        manifest = None
+    if isinstance(manifest, ast.Dict):
+        for key, value in zip(manifest.keys, manifest.values):
+            if isinstance(key, ast.Constant) and key.value == "depends":
+                # ast offsets count utf-8 bytes, so slice the encoded source
+                raw = data.encode("utf-8")
+                lines = raw.splitlines(keepends=True)
+                start = sum(len(line) for line in lines[:key.lineno - 1]) + key.col_offset
+                end = sum(len(line) for line in lines[:value.end_lineno - 1]) + value.end_col_offset
+                # Consume the original trailing comma, which may sit after whitespace;
+                # dep_string brings its own and leaving both behind would corrupt the file
+                comma = re.match(rb"\s*,", raw[end:])
+                if comma:
+                    end += comma.end()
+                return (raw[:start] + dep_string.encode("utf-8") + raw[end:]).decode("utf-8")
+    return _DEPENDS_RE.sub(dep_string, data)
+
+
+def modify_manifest(manifest, module_list):
+    """
+    Modifies, in place, the "depends" element, replacing the old dependency list with the modules in module_list
+    :param manifest: path to the manifest file
+    :param module_list: list of modules to place in the manifest file
+    :return:
+    """
+    dep_string = create_deps_string(module_list)
+    with open(manifest) as f_in:
+        data = f_in.read()
+    data = _replace_depends(data, dep_string)
+    with open(manifest, "wt") as f_out:
+        f_out.write(data)
+
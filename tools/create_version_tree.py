@@ -2,7 +2,12 @@ import json
 import os.path
 from pathlib import Path
 
-from auto_clean_dependencies import _read_deps
+from .core import read_deps
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 
 def _serialize_sets(obj):
@@ -13,11 +18,18 @@ def _serialize_sets(obj):
 
 
 def create_version_tree(version, path):
-    dependency_tree = _read_deps(path)
-    trees = Path("../trees")
+    dependency_tree = read_deps(path)
+    # Anchor on this file rather than the cwd, so the trees always land in the repository
+    trees = Path(__file__).resolve().parent.parent / "trees"
     trees.mkdir(exist_ok=True)
-    with open(Path(trees, version + ".json"), "wt") as fout:
-        fout.write(json.dumps(dependency_tree, indent=4, default=_serialize_sets))
+    if orjson is not None:
+        with open(Path(trees, version + ".json"), "wb") as fout:
+            fout.write(orjson.dumps(dependency_tree, default=_serialize_sets,
+                                    option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS))
+    else:
+        # json.dump streams into the file instead of materializing the whole document as one str
+        with open(Path(trees, version + ".json"), "wt") as fout:
+            json.dump(dependency_tree, fout, indent=4, default=_serialize_sets)
 
 
 if __name__ == '__main__':